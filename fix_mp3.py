@@ -5,53 +5,129 @@ Fix .mp3 and .srt references in .tscn files after files have been renamed
 
 Usage: python fix_mp3_refs.py [project_root]
   project_root: path to the Godot project folder (default: ./project)
+
+Optional: pip install rapidfuzz regex  (faster fuzzy matching and tag scanning)
 """
 
-import re
+import mmap
+import os
 import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from difflib import SequenceMatcher
+from functools import lru_cache
+
+try:
+    import regex as re
+except ImportError:
+    import re
+
+try:
+    from rapidfuzz import process, fuzz
+except ImportError:
+    process = fuzz = None
+
+
+# Scene scanning runs on raw bytes (memory-mapped .tscn files).
+# Any ext_resource tag (full tag); attributes are then extracted from it,
+# independently of their order
+EXT_RESOURCE_RE = re.compile(rb'\[ext_resource\b[^\]]*\]')
+ATTR_TYPE_AUDIO = re.compile(rb'\btype="AudioStream"')
+ATTR_MP3_PATH   = re.compile(rb'\bpath="([^"]+\.mp3)"')
+ATTR_SRT_PATH   = re.compile(rb'\bpath="([^"]+\.srt)"')
+ATTR_ID         = re.compile(rb'\bid="([^"]+)"')
+# Plain string property: any_property_name = "res://...srt"
+SRT_STRING_RE   = re.compile(rb'=\s*"(res://[^"]+\.srt)"')
+IMPORT_UID_RE   = re.compile(r'^uid\s*=\s*"([^"]+)"', re.MULTILINE)
 
 
 # ── helpers ──────────────────────────────────────────────────────────────────
 
+# Same character mapping as the bash renaming script
+REPLACEMENTS = {
+    'à':'a','á':'a','â':'a','ã':'a','ä':'a','å':'a',
+    'À':'A','Á':'A','Â':'A','Ã':'A','Ä':'A','Å':'A',
+    'è':'e','é':'e','ê':'e','ë':'e',
+    'È':'E','É':'E','Ê':'E','Ë':'E',
+    'ì':'i','í':'i','î':'i','ï':'i',
+    'Ì':'I','Í':'I','Î':'I','Ï':'I',
+    'ò':'o','ó':'o','ô':'o','õ':'o','ö':'o',
+    'Ò':'O','Ó':'O','Ô':'O','Õ':'O','Ö':'O',
+    'ù':'u','ú':'u','û':'u','ü':'u',
+    'Ù':'U','Ú':'U','Û':'U','Ü':'U',
+    'ý':'y','ÿ':'y','Ý':'Y',
+    'ñ':'n','Ñ':'N',
+    'ç':'c','Ç':'C',
+    'œ':'oe','Œ':'Oe',
+    'æ':'ae','Æ':'Ae',
+    ' ':None,
+}
+_TRANS = str.maketrans(REPLACEMENTS)
+_STRIP_RE = re.compile(r'[^a-zA-Z0-9.\-]')
+
+
+@lru_cache(maxsize=4096)
 def normalize_filename(name: str) -> str:
     """Apply the same renaming logic as the bash script."""
-    replacements = {
-        'à':'a','á':'a','â':'a','ã':'a','ä':'a','å':'a',
-        'À':'A','Á':'A','Â':'A','Ã':'A','Ä':'A','Å':'A',
-        'è':'e','é':'e','ê':'e','ë':'e',
-        'È':'E','É':'E','Ê':'E','Ë':'E',
-        'ì':'i','í':'i','î':'i','ï':'i',
-        'Ì':'I','Í':'I','Î':'I','Ï':'I',
-        'ò':'o','ó':'o','ô':'o','õ':'o','ö':'o',
-        'Ò':'O','Ó':'O','Ô':'O','Õ':'O','Ö':'O',
-        'ù':'u','ú':'u','û':'u','ü':'u',
-        'Ù':'U','Ú':'U','Û':'U','Ü':'U',
-        'ý':'y','ÿ':'y','Ý':'Y',
-        'ñ':'n','Ñ':'N',
-        'ç':'c','Ç':'C',
-        'œ':'oe','Œ':'Oe',
-        'æ':'ae','Æ':'Ae',
-    }
-    result = []
-    for ch in name:
-        result.append(replacements.get(ch, ch))
-    name = ''.join(result)
-    name = name.replace(' ', '')
-    name = re.sub(r'[^a-zA-Z0-9.\-]', '', name)
-    return name
+    return _STRIP_RE.sub('', name.translate(_TRANS))
 
 
+@lru_cache(maxsize=16384)
 def fuzzy_score(a: str, b: str) -> float:
+    """Pure-Python fallback scorer, used when rapidfuzz is not installed."""
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
 
-def find_renamed_file(original_res_path: str, project_root: Path, glob_ext: str) -> Path | None:
+def best_fuzzy_match(query: str, choices, cutoff: float = 0.7) -> str | None:
+    """
+    Return the choice most similar to query, or None if below cutoff (0..1).
+    Uses rapidfuzz (C++) when available, SequenceMatcher otherwise.
+    """
+    if process is not None:
+        match = process.extractOne(query, choices, scorer=fuzz.ratio, score_cutoff=cutoff * 100)
+        return match[0] if match else None
+
+    best_score = 0.0
+    best = None
+    for choice in choices:
+        score = fuzzy_score(query, choice)
+        if score > best_score:
+            best_score = score
+            best = choice
+    return best if best_score >= cutoff else None
+
+
+def build_asset_index(project_root: Path, extensions: tuple[str, ...]) -> dict[str, dict[str, list[Path]]]:
+    """
+    Walk project_root once and index files by extension, then by lowercase stem.
+    extensions: e.g. ('.mp3', '.srt')
+    Returns: {'.mp3': {'voix_nb': [Path, ...]}, '.srt': {...}}
+    """
+    index = {ext: defaultdict(list) for ext in extensions}
+    stack = [str(project_root)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                stem, ext = os.path.splitext(entry.name)
+                by_stem = index.get(ext.lower())
+                if by_stem is not None and entry.is_file():
+                    by_stem[stem.lower()].append(Path(entry.path))
+    return index
+
+
+def find_renamed_file(original_res_path: str, project_root: Path, index: dict[str, list[Path]]) -> Path | None:
     """
     Find a renamed file on disk.
-    Tries: exact path → normalized name → fuzzy match.
-    glob_ext: e.g. '*.mp3' or '*.srt'
+    Tries: exact path → normalized name → indexed stem → fuzzy match.
+    index: {lowercase stem: [Path, ...]} for the wanted extension (see build_asset_index)
     """
     rel = original_res_path.replace('res://', '')
     original_abs = project_root / rel
@@ -67,33 +143,38 @@ def find_renamed_file(original_res_path: str, project_root: Path, glob_ext: str)
     if candidate.exists():
         return candidate
 
-    # 3. Fuzzy search — find the nearest existing ancestor directory first
-    search_dirs = [parent]
+    # 3. Indexed search — restricted to the nearest existing ancestor directory
+    search_dir = parent
     if not parent.exists():
         parts = Path(rel).parts
         for i in range(len(parts), 0, -1):
             ancestor = project_root.joinpath(*parts[:i])
             if ancestor.exists():
-                search_dirs = [ancestor]
+                search_dir = ancestor
                 break
+    if not search_dir.is_dir():
+        return None
+
+    prefix = os.path.join(str(search_dir), '')
+
+    def first_in_search_dir(paths: list[Path]) -> Path | None:
+        return next((f for f in paths if str(f).startswith(prefix)), None)
 
-    best_score = 0.0
-    best_path = None
     norm_stem = normalize_filename(original_abs.stem).lower()
 
-    for search_dir in search_dirs:
-        if not search_dir.is_dir():
-            continue
-        for f in search_dir.rglob(glob_ext):
-            score = fuzzy_score(norm_stem, f.stem.lower())
-            if score > best_score:
-                best_score = score
-                best_path = f
+    exact = first_in_search_dir(index.get(norm_stem, []))
+    if exact is not None:
+        return exact
 
-    if best_path and best_score >= 0.7:
-        return best_path
+    # 4. Fuzzy search over the indexed stems below search_dir
+    candidates = {}
+    for stem, paths in index.items():
+        f = first_in_search_dir(paths)
+        if f is not None:
+            candidates[stem] = f
 
-    return None
+    best_stem = best_fuzzy_match(norm_stem, candidates.keys())
+    return candidates[best_stem] if best_stem is not None else None
 
 
 def read_import_uid(import_file: Path) -> str | None:
@@ -102,7 +183,7 @@ def read_import_uid(import_file: Path) -> str | None:
         text = import_file.read_text(encoding='utf-8')
     except Exception:
         return None
-    m = re.search(r'^uid\s*=\s*"([^"]+)"', text, re.MULTILINE)
+    m = IMPORT_UID_RE.search(text)
     return m.group(1) if m else None
 
 
@@ -115,17 +196,72 @@ def abs_to_res(path: Path, project_root: Path) -> str:
         return 'res://' + path.as_posix()
 
 
+def _decode(raw: bytes) -> str:
+    return raw.decode('utf-8', errors='replace')
+
+
+def find_references(data) -> tuple[list, list]:
+    """
+    Find MP3 and SRT references in raw scene bytes (bytes or mmap).
+    Returns: (mp3_matches [(path, uid), ...], srt_matches [(path, uid_or_none), ...])
+    """
+    mp3_matches = []  # [(path, uid), ...]
+    srt_tag_paths = set()
+    srt_matches = []
+    for tag in EXT_RESOURCE_RE.findall(data):
+        m_id = ATTR_ID.search(tag)
+
+        m_path = ATTR_MP3_PATH.search(tag)
+        if m_path and m_id and ATTR_TYPE_AUDIO.search(tag):
+            mp3_matches.append((_decode(m_path.group(1)), _decode(m_id.group(1))))
+            continue
+
+        # 1. SRT ext_resource tags (order-independent, to avoid double-matching)
+        m_path = ATTR_SRT_PATH.search(tag)
+        if not m_path:
+            continue
+        path = _decode(m_path.group(1))
+        srt_tag_paths.add(path)
+        srt_matches.append((path, _decode(m_id.group(1)) if m_id else None))
+
+    # 2. Plain string properties: any_name = "res://...srt"
+    #    Skip paths already captured as ext_resource (they'd be duplicates)
+    for m in SRT_STRING_RE.finditer(data):
+        path = _decode(m.group(1))
+        if path not in srt_tag_paths:
+            srt_matches.append((path, None))
+
+    return mp3_matches, srt_matches
+
+
+def scan_tscn(tscn_path: Path) -> tuple[Path, list, list, Exception | None]:
+    """
+    Memory-map one scene and find its references. Runs in worker processes.
+    Returns: (tscn_path, mp3_matches, srt_matches, read_error)
+    """
+    try:
+        with open(tscn_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return tscn_path, [], [], None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mp3_matches, srt_matches = find_references(mm)
+    except Exception as e:
+        return tscn_path, [], [], e
+    return tscn_path, mp3_matches, srt_matches, None
+
+
 # ── collect changes ───────────────────────────────────────────────────────────
 
-def collect_mp3_changes(matches: list, project_root: Path) -> list:
+def collect_mp3_changes(matches: list, project_root: Path, index: dict) -> list:
     """
     matches: list of (old_path, old_uid)
+    index: {lowercase stem: [Path, ...]} of the project's .mp3 files
     Returns: list of (old_path, old_uid, new_res_path, new_uid, warnings)
     """
     pending = []
     for old_path, old_uid in matches:
         warn = []
-        new_file = find_renamed_file(old_path, project_root, '*.mp3')
+        new_file = find_renamed_file(old_path, project_root, index)
         if new_file is None:
             warn.append("renamed file not found on disk")
             pending.append((old_path, old_uid, None, None, warn))
@@ -150,16 +286,17 @@ def collect_mp3_changes(matches: list, project_root: Path) -> list:
     return pending
 
 
-def collect_srt_changes(matches: list, project_root: Path) -> list:
+def collect_srt_changes(matches: list, project_root: Path, index: dict) -> list:
     """
     matches: list of (old_path, old_uid_or_none)
+    index: {lowercase stem: [Path, ...]} of the project's .srt files
     SRT files have no .import, so uid is passed through unchanged if present.
     Returns: list of (old_path, old_uid, new_res_path, new_uid, warnings)
     """
     pending = []
     for old_path, old_uid in matches:
         warn = []
-        new_file = find_renamed_file(old_path, project_root, '*.srt')
+        new_file = find_renamed_file(old_path, project_root, index)
         if new_file is None:
             warn.append("renamed file not found on disk")
             pending.append((old_path, old_uid, None, None, warn))
@@ -234,15 +371,37 @@ def preview_and_confirm(pending: list, label: str) -> list:
 
 
 def apply_changes(content: str, actionable: list, has_uid: bool) -> str:
+    """Rewrite every changed path/uid in a single pass over content."""
+    path_map = {}
+    uid_map = {}
     for old_path, old_uid, new_res_path, new_uid, _ in actionable:
         if old_path != new_res_path:
-            # Replace in ext_resource tag attribute: path="old"
-            content = content.replace(f'path="{old_path}"', f'path="{new_res_path}"')
-            # Replace as bare string value: = "res://...srt"
-            content = content.replace(f'"{old_path}"', f'"{new_res_path}"')
+            path_map[old_path] = new_res_path
         if has_uid and old_uid and old_uid != new_uid:
-            content = content.replace(f'"{old_uid}"', f'"{new_uid}"')
-    return content
+            uid_map[old_uid] = new_uid
+
+    def alternation(keys) -> str:
+        return '|'.join(map(re.escape, sorted(keys, key=len, reverse=True)))
+
+    branches = []
+    if path_map:
+        # Paths only as assigned values: path="old" in ext_resource tags
+        # and bare string properties: = "res://...srt"
+        branches.append(r'(?P<pre>=\s*)"(?P<path>' + alternation(path_map) + ')"')
+    if uid_map:
+        # Ids anywhere they are quoted: id="..." and ExtResource("...")
+        branches.append(r'"(?P<uid>' + alternation(uid_map) + ')"')
+    if not branches:
+        return content
+
+    def replace(m) -> str:
+        groups = m.groupdict()
+        if groups.get('path') is not None:
+            return f'{groups["pre"]}"{path_map[groups["path"]]}"'
+        return f'"{uid_map[groups["uid"]]}"'
+
+    pattern = re.compile('|'.join(branches))
+    return pattern.sub(replace, content)
 
 
 # ── main ─────────────────────────────────────────────────────────────────────
@@ -258,50 +417,22 @@ def main():
     print(f"Project root : {project_root}")
     print(f"Scanning for .tscn files...\n")
 
-    # ext_resource with AudioStream type and .mp3 path — captures (path, id)
-    mp3_re = re.compile(
-        r'\[ext_resource\b[^\]]*\btype="AudioStream"[^\]]*\bpath="([^"]+\.mp3)"[^\]]*\bid="([^"]+)"[^\]]*\]'
-    )
-    # Match any ext_resource tag (full tag), then extract .srt path + id from it
-    ext_resource_re = re.compile(r'\[ext_resource\b[^\]]*\]')
-    srt_attr_path   = re.compile(r'\bpath="([^"]+\.srt)"')
-    srt_attr_id     = re.compile(r'\bid="([^"]+)"')
-    # Plain string property: any_property_name = "res://...srt"
-    srt_string_re   = re.compile(r'=\s*"(res://[^"]+\.srt)"')
-
     tscn_files = list(project_root.rglob('*.tscn'))
     print(f"Found {len(tscn_files)} .tscn file(s)\n")
 
+    # One walk of the project for every renamed-file lookup
+    asset_index = build_asset_index(project_root, ('.mp3', '.srt'))
+
     total_replacements = 0
 
-    for tscn_path in tscn_files:
-        try:
-            content = tscn_path.read_text(encoding='utf-8')
-        except Exception as e:
-            print(f"  [SKIP] Cannot read {tscn_path}: {e}")
-            continue
+    # Detection runs in parallel; preview/confirm below stays serial
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        scans = list(executor.map(scan_tscn, tscn_files, chunksize=16))
 
-        mp3_matches = mp3_re.findall(content)  # [(path, uid), ...]
-
-        # Find SRT references:
-        # 1. ext_resource tags (order-independent, to avoid double-matching)
-        srt_tag_paths = set()
-        srt_matches = []
-        for tag in ext_resource_re.findall(content):
-            m_path = srt_attr_path.search(tag)
-            if not m_path:
-                continue
-            m_id = srt_attr_id.search(tag)
-            path = m_path.group(1)
-            srt_tag_paths.add(path)
-            srt_matches.append((path, m_id.group(1) if m_id else None))
-
-        # 2. Plain string properties: any_name = "res://...srt"
-        #    Skip paths already captured as ext_resource (they'd be duplicates)
-        for m in srt_string_re.finditer(content):
-            path = m.group(1)
-            if path not in srt_tag_paths:
-                srt_matches.append((path, None))
+    for tscn_path, mp3_matches, srt_matches, error in scans:
+        if error is not None:
+            print(f"  [SKIP] Cannot read {tscn_path}: {error}")
+            continue
 
         if not mp3_matches and not srt_matches:
             continue
@@ -312,23 +443,28 @@ def main():
         print(f"       mp3 references: {len(mp3_matches)}   "
               f"srt references: {len(srt_matches)}")
 
-        new_content = content
+        # Decoded lazily, only once there is something to rewrite
+        new_content = None
         file_changed = False
 
         # ── MP3 ──────────────────────────────────────────────────────────
         if mp3_matches:
-            pending_mp3 = collect_mp3_changes(mp3_matches, project_root)
+            pending_mp3 = collect_mp3_changes(mp3_matches, project_root, asset_index['.mp3'])
             actionable_mp3 = preview_and_confirm(pending_mp3, 'MP3')
             if actionable_mp3:
+                if new_content is None:
+                    new_content = tscn_path.read_text(encoding='utf-8')
                 new_content = apply_changes(new_content, actionable_mp3, has_uid=True)
                 total_replacements += len(actionable_mp3)
                 file_changed = True
 
         # ── SRT ──────────────────────────────────────────────────────────
         if srt_matches:
-            pending_srt = collect_srt_changes(srt_matches, project_root)
+            pending_srt = collect_srt_changes(srt_matches, project_root, asset_index['.srt'])
             actionable_srt = preview_and_confirm(pending_srt, 'SRT')
             if actionable_srt:
+                if new_content is None:
+                    new_content = tscn_path.read_text(encoding='utf-8')
                 new_content = apply_changes(new_content, actionable_srt, has_uid=False)
                 total_replacements += len(actionable_srt)
                 file_changed = True
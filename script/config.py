@@ -25,7 +25,9 @@ DEFAULT_CONFIG = {
     'batch_delay_seconds': 60,
     'max_file_size_mb': 100,
     'server_port': 8080,
-    'server_host': '0.0.0.0'
+    'server_host': '0.0.0.0',
+    'server_workers': None,
+    'watch_ignore_patterns': None
 }
 
 # Git configuration
@@ -40,8 +42,20 @@ GIT_IGNORE_PATTERNS = [
 ]
 
 # File watcher settings
+# Fingerprints of the last committed content, used to skip identical rewrites
+FINGERPRINT_CACHE_FILE = os.path.join(SCRIPT_DIR, '.asset_sync_cache.pkl')
 WATCH_RECURSIVE = True
 DEBOUNCE_SECONDS = 2
+# Shell-style name patterns the watcher drops before touching the file;
+# a trailing slash marks a directory that is not watched at all
+WATCH_IGNORE_PATTERNS = [
+    '.git/',
+    '*.swp',
+    '*.tmp',
+    '~$*',
+    '.DS_Store',
+    '*.part'
+]
 
 # Server settings
 UPLOAD_ALLOWED_EXTENSIONS = set()  # Empty set means all extensions allowed
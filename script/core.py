@@ -3,46 +3,119 @@ Core implementation of the asset sync system.
 """
 
 import os
+import re
+import sys
 import json
+import stat
+import pickle
+import hashlib
+import fnmatch
 import time
+import shutil
+import functools
+import importlib.util
 import subprocess
 import threading
 from pathlib import Path
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import parse_qs
 
-from config import *
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from config import (
+    REPO_ROOT, PROJECT_DIR, ASSETS_DIR, BUILDS_DIR, SCRIPT_DIR,
+    USER_CONFIG_FILE, DEFAULT_CONFIG, GIT_IGNORE_PATTERNS,
+    WATCH_RECURSIVE, WATCH_IGNORE_PATTERNS, FINGERPRINT_CACHE_FILE,
+)
 
 # ============================================================================
 # Configuration Management
 # ============================================================================
 
+# orjson when installed, stdlib json otherwise; same output either way
+def _load_json(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dump_json(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, indent=2, sort_keys=True, ensure_ascii=False).encode()
+
+# Parsed user config, reused until the file's mtime changes
+_CFG_CACHE = {'mtime': None, 'cfg': None}
+
 def load_config():
-    if not os.path.exists(USER_CONFIG_FILE):
+    try:
+        mtime = os.stat(USER_CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
         return DEFAULT_CONFIG.copy()
     
-    with open(USER_CONFIG_FILE, 'r') as f:
-        user_config = json.load(f)
+    if mtime != _CFG_CACHE['mtime']:
+        user_config = _load_json(Path(USER_CONFIG_FILE).read_bytes())
+        
+        config = DEFAULT_CONFIG.copy()
+        config.update(user_config)
+        _CFG_CACHE['mtime'] = mtime
+        _CFG_CACHE['cfg'] = config
     
-    config = DEFAULT_CONFIG.copy()
-    config.update(user_config)
-    return config
+    return _CFG_CACHE['cfg'].copy()
 
-def save_config(config):
+def save_config(config, durable=False):
     os.makedirs(SCRIPT_DIR, exist_ok=True)
-    with open(USER_CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+    
+    # Written next to the target and renamed over it, so a crash leaves
+    # either the old or the new file, never a truncated one
+    tmp_path = USER_CONFIG_FILE + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_dump_json(config))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, USER_CONFIG_FILE)
+    
+    # Also persist the rename itself (explicit saves only)
+    if durable and hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(SCRIPT_DIR, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    
+    # Prime the cache with what was just written; a rewrite landing within
+    # the same mtime tick would otherwise keep serving the old values
+    saved = DEFAULT_CONFIG.copy()
+    saved.update(config)
+    _CFG_CACHE['mtime'] = os.stat(USER_CONFIG_FILE).st_mtime_ns
+    _CFG_CACHE['cfg'] = saved
+
+REQUIRED_CONFIG_KEYS = ('repo_url', 'ntu_name', 'git_username', 'git_email')
 
 def validate_config(config):
-    if not config.get('repo_url'):
-        return False, 'repo_url is required'
-    if not config.get('ntu_name'):
-        return False, 'ntu_name is required'
-    if not config.get('git_username'):
-        return False, 'git_username is required'
-    if not config.get('git_email'):
-        return False, 'git_email is required'
+    for key in REQUIRED_CONFIG_KEYS:
+        is_valid, error = validate_config_field(key, config.get(key))
+        if not is_valid:
+            return False, error
+    return True, ''
+
+def validate_config_field(key, value):
+    if key in REQUIRED_CONFIG_KEYS and not value:
+        return False, f'{key} is required'
+    if key in ('batch_delay_seconds', 'max_file_size_mb', 'server_port'):
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            return False, f'{key} must be a positive integer'
+        if key == 'server_port' and value > 65535:
+            return False, 'server_port must be at most 65535'
+    if key == 'server_workers' and value is not None:
+        # None means one worker per CPU
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            return False, 'server_workers must be a positive integer or null'
+    if key == 'watch_ignore_patterns' and value is not None:
+        # A bare string would be taken one character (pattern) at a time
+        if not isinstance(value, list) or not all(isinstance(p, str) and p for p in value):
+            return False, 'watch_ignore_patterns must be a list of patterns or null'
     return True, ''
 
 # ============================================================================
@@ -102,34 +175,413 @@ def test_git_authentication():
         return False
 
 def format_commit_message(files, ntu_name):
-    rel_files = []
-    for f in files:
-        rel_path = os.path.relpath(f, REPO_ROOT)
-        rel_files.append(rel_path)
-    
+    return _format_rel_commit_message([os.path.relpath(f, REPO_ROOT) for f in files], ntu_name)
+
+def _format_rel_commit_message(rel_files, ntu_name):
     if len(rel_files) == 0:
         return f'{ntu_name}: no files'
     
     if len(rel_files) == 1:
         return f'{ntu_name}: {rel_files[0]}'
     
-    file_str = ', '.join(rel_files[:3])
+    # Files sharing a directory are listed by name, with the directory once
+    prefix = os.path.commonpath(rel_files)
+    if prefix in rel_files:
+        prefix = os.path.dirname(prefix)
+    cut = len(prefix) + 1 if prefix else 0
+    
+    file_str = ', '.join(f[cut:] for f in rel_files[:3])
     if len(rel_files) > 3:
         file_str += f' (+{len(rel_files) - 3} more)'
+    if prefix:
+        file_str += f' in {prefix}{os.sep}'
     
     return f'{ntu_name}: {file_str}'
 
-def git_add_commit_push(files, ntu_name):
+# Long-running git plumbing processes answering one request per line
+# (`hash-object --stdin-paths`, `cat-file --batch-check`), so repeated
+# queries cost a pipe round-trip instead of a git fork each. One session
+# per thread: concurrent callers never share or serialize on a pipe.
+class GitSession:
+    def __init__(self):
+        self.hasher = self._spawn(['git', 'hash-object', '-w', '--stdin-paths'])
+        self.catter = self._spawn(['git', 'cat-file', '--batch-check'])
+    
+    @staticmethod
+    def _spawn(args):
+        return subprocess.Popen(args, cwd=REPO_ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    
+    @staticmethod
+    def _request(proc, line):
+        proc.stdin.write(line + b'\n')
+        proc.stdin.flush()
+        reply = proc.stdout.readline().strip()
+        if not reply:
+            raise subprocess.CalledProcessError(proc.poll() or 1, proc.args)
+        return reply
+    
+    def alive(self):
+        return self.hasher.poll() is None and self.catter.poll() is None
+    
+    def hash_object(self, rel_path):
+        # Writes the blob and returns its id
+        return self._request(self.hasher, os.fsencode(rel_path))
+    
+    def object_id(self, name):
+        # e.g. 'HEAD:project/assets/a.png'; None if it does not exist
+        reply = self._request(self.catter, os.fsencode(name))
+        if reply.endswith(b' missing') or reply.endswith(b' ambiguous'):
+            return None
+        return reply.split()[0]
+    
+    def close(self):
+        for proc in (self.hasher, self.catter):
+            if proc.poll() is None:
+                proc.stdin.close()
+                proc.wait()
+
+_git_local = threading.local()
+_git_sessions = []
+_git_sessions_lock = threading.Lock()
+
+def get_git_session():
+    session = getattr(_git_local, 'session', None)
+    if session is None or not session.alive():
+        session = GitSession()
+        _git_local.session = session
+        with _git_sessions_lock:
+            _git_sessions.append(session)
+    return session
+
+def close_git_sessions():
+    with _git_sessions_lock:
+        for session in _git_sessions:
+            session.close()
+        _git_sessions.clear()
+
+# Files above this size get a cheap edge fingerprint first and are only
+# hashed in full when that matches the last committed one
+FINGERPRINT_FULL_LIMIT = 16 * 1024 * 1024
+FINGERPRINT_EDGE = 1024 * 1024
+
+# Directory fds opened on first use and kept for the life of the process;
+# per-file calls then resolve names relative to them (the *at() syscalls)
+# instead of walking the absolute path from / every time
+_dir_fds = {}
+_dir_fds_lock = threading.Lock()
+
+def _dir_fd(path):
+    if not hasattr(os, 'O_DIRECTORY') or not {os.open, os.stat} <= os.supports_dir_fd:
+        return None
+    with _dir_fds_lock:
+        fd = _dir_fds.get(path)
+        if fd is None:
+            fd = _dir_fds[path] = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        return fd
+
+def _repo_lstat(rel_path):
+    fd = _dir_fd(REPO_ROOT)
+    if fd is None:
+        return os.lstat(os.path.join(REPO_ROOT, rel_path))
+    return os.stat(rel_path, dir_fd=fd, follow_symlinks=False)
+
+def _repo_open(rel_path):
+    # Symlinks are not followed (ELOOP): they are committed as links
+    fd = _dir_fd(REPO_ROOT)
+    if fd is None:
+        return open(os.path.join(REPO_ROOT, rel_path), 'rb')
+    return open(os.open(rel_path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0), dir_fd=fd), 'rb')
+
+def _blake2b_file(f, size, edges=False):
+    # Buffered reads rather than mmap: the editor may still be writing or
+    # truncating the file, which must not crash the watcher
+    h = hashlib.blake2b(digest_size=16)
+    f.seek(0)
+    if edges:
+        h.update(size.to_bytes(8, 'little'))
+        h.update(f.read(FINGERPRINT_EDGE))
+        f.seek(max(0, size - FINGERPRINT_EDGE))
+        h.update(f.read(FINGERPRINT_EDGE))
+        return h.digest()
+    
+    buf = bytearray(FINGERPRINT_EDGE)
+    with memoryview(buf) as view:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.digest()
+
+def _stat_stamp(st):
+    return st.st_size, st.st_mtime_ns
+
+# Content fingerprints of what was last committed, persisted across runs,
+# so rewrites with identical bytes are dropped without asking git to hash
+# them. Each entry keeps the blob id it was committed as; a file is only
+# skipped while HEAD still holds that blob, so commits made elsewhere
+# (another machine, plain git) are never masked.
+class FingerprintCache:
+    def __init__(self, path):
+        self.path = path
+        self.pending = {}
+        try:
+            with open(path, 'rb') as f:
+                self.entries = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            self.entries = {}
+        if not isinstance(self.entries, dict):
+            self.entries = {}
+    
+    def _fingerprint(self, rel_path, cached):
+        # ((size, edge digest or None, full digest or None, executable),
+        # stat stamp); (None, None) if not a regular file. The execute bit is
+        # part of it so a chmod alone still reaches the stager.
+        with _repo_open(rel_path) as f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                return None, None
+            size = st.st_size
+            executable = bool(st.st_mode & stat.S_IXUSR)
+            if size <= FINGERPRINT_FULL_LIMIT:
+                return (size, None, _blake2b_file(f, size), executable), _stat_stamp(st)
+            edges = _blake2b_file(f, size, edges=True)
+            if cached is None or cached[:2] != (size, edges):
+                return (size, edges, None, executable), _stat_stamp(st)
+            return (size, edges, _blake2b_file(f, size), executable), _stat_stamp(st)
+    
+    def changed(self, rel_files, session):
+        self.pending = {}
+        changed = []
+        for rel_path in rel_files:
+            cached = self.entries.get(rel_path)
+            try:
+                fingerprint, stamp = self._fingerprint(rel_path, cached)
+            except OSError:
+                fingerprint, stamp = None, None
+            
+            # A missing full digest never matches, git decides those
+            if (fingerprint is not None and fingerprint[2] is not None
+                    and cached is not None and fingerprint == cached[:4]):
+                index_path = rel_path.replace(os.sep, '/')
+                if session.object_id(f'HEAD:{index_path}') == cached[4]:
+                    continue
+            
+            changed.append(rel_path)
+            self.pending[rel_path] = (fingerprint, stamp)
+        return changed
+    
+    def commit(self, blob_ids):
+        # Called once the files passed to changed() match HEAD; blob_ids
+        # maps each file still present to the blob it was staged as
+        pending, self.pending = self.pending, {}
+        dirty = False
+        for rel_path, (fingerprint, stamp) in pending.items():
+            blob_id = blob_ids.get(rel_path)
+            # Rewritten since it was fingerprinted: the blob may not match
+            try:
+                settled = stamp is not None and _stat_stamp(_repo_lstat(rel_path)) == stamp
+            except OSError:
+                settled = False
+            
+            if fingerprint is not None and blob_id is not None and settled:
+                entry = fingerprint + (blob_id,)
+                if self.entries.get(rel_path) != entry:
+                    self.entries[rel_path] = entry
+                    dirty = True
+            elif self.entries.pop(rel_path, None) is not None:
+                dirty = True
+        if not dirty:
+            return
+        
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'Could not save fingerprint cache: {e}')
+
+# Stages files through the calling thread's GitSession: blobs are hashed by
+# the long-running hash-object, files whose mode and blob already match the
+# index are dropped, and the index is updated with a single `update-index --index-info`
+class GitStager:
+    def __init__(self, fingerprint_file=None):
+        self.fingerprints = FingerprintCache(fingerprint_file) if fingerprint_file else None
+        self.blob_ids = {}
+        self.filemode = None
+    
+    def _trust_filemode(self):
+        # core.fileMode=false (the Windows default): the execute bit on disk
+        # means nothing and tracked modes are kept as they are
+        if self.filemode is None:
+            result = subprocess.run(['git', 'config', '--type=bool', '--get', 'core.fileMode'],
+                                    cwd=REPO_ROOT, capture_output=True, text=True)
+            self.filemode = os.name == 'posix' and result.stdout.strip() != 'false'
+        return self.filemode
+    
+    @staticmethod
+    def _ignored(rel_files):
+        # Untracked paths matched by .gitignore, which `git add` would refuse
+        result = subprocess.run(['git', 'check-ignore', '-z', '--stdin'], cwd=REPO_ROOT,
+                                input=b''.join(os.fsencode(f) + b'\0' for f in rel_files),
+                                capture_output=True)
+        if result.returncode not in (0, 1):
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        return {os.fsdecode(p) for p in result.stdout.split(b'\0') if p}
+    
+    @staticmethod
+    def _entries(args, index_paths, sha_field):
+        # {path: (mode, blob id)} from `ls-files -s` or `ls-tree` output;
+        # paths go in slices so a large batch never overflows the command line
+        entries = {}
+        for i in range(0, len(index_paths), 1000):
+            result = subprocess.run([*args, '--', *index_paths[i:i + 1000]], cwd=REPO_ROOT,
+                                    env=dict(os.environ, GIT_LITERAL_PATHSPECS='1'),
+                                    check=True, capture_output=True)
+            for line in result.stdout.split(b'\0'):
+                if line:
+                    info, _, path = line.partition(b'\t')
+                    fields = info.split()
+                    entries[os.fsdecode(path)] = (fields[0], fields[sha_field])
+        return entries
+    
+    def stage(self, rel_files):
+        if rel_files:
+            ignored = self._ignored(rel_files)
+            rel_files = [f for f in rel_files if f not in ignored]
+        
+        session = get_git_session()
+        self.blob_ids = {}
+        if self.fingerprints:
+            rel_files = self.fingerprints.changed(rel_files, session)
+        
+        # Like git add, a file is staged unless its index entry already has
+        # the same mode and blob; it is reported changed if HEAD's differs
+        index_entries, head_entries = {}, {}
+        if rel_files:
+            index_paths = [f.replace(os.sep, '/') for f in rel_files]
+            index_entries = self._entries(['git', 'ls-files', '-s', '-z'], index_paths, 1)
+            if session.object_id('HEAD') is not None:
+                head_entries = self._entries(['git', 'ls-tree', '-r', '-z', 'HEAD'], index_paths, 2)
+        trust_filemode = self._trust_filemode()
+        
+        entries = []
+        changed = []
+        for rel_path in rel_files:
+            index_path = rel_path.replace(os.sep, '/')
+            index_entry = index_entries.get(index_path)
+            try:
+                st = _repo_lstat(rel_path)
+            except OSError:
+                st = None
+            
+            if st is not None and stat.S_ISLNK(st.st_mode):
+                # Stored as a link whose blob is the target path, like git add
+                target = os.readlink(os.path.join(REPO_ROOT, rel_path))
+                sha = subprocess.run(['git', 'hash-object', '-w', '--stdin'], cwd=REPO_ROOT,
+                                     input=os.fsencode(target), check=True, capture_output=True).stdout.strip()
+                mode = b'120000'
+            elif st is not None and stat.S_ISREG(st.st_mode):
+                sha = session.hash_object(rel_path)
+                if trust_filemode:
+                    # Same rule as git: the owner's execute bit decides the mode
+                    mode = b'100755' if st.st_mode & stat.S_IXUSR else b'100644'
+                elif index_entry is not None and index_entry[0] == b'100755':
+                    mode = b'100755'
+                else:
+                    mode = b'100644'
+            else:
+                if index_entry is not None:
+                    # Mode 0 removes the path from the index
+                    entries.append(b'0 ' + b'0' * 40 + b'\t' + os.fsencode(index_path))
+                if index_path in head_entries:
+                    changed.append(rel_path)
+                continue
+            
+            self.blob_ids[rel_path] = sha
+            if (mode, sha) != index_entry:
+                entries.append(mode + b' ' + sha + b'\t' + os.fsencode(index_path))
+            if (mode, sha) != head_entries.get(index_path):
+                changed.append(rel_path)
+        
+        if entries:
+            subprocess.run(['git', 'update-index', '-z', '--add', '--remove', '--index-info'],
+                           cwd=REPO_ROOT, input=b'\0'.join(entries) + b'\0', check=True, capture_output=True)
+        return changed
+    
+    def committed(self):
+        # The last staged batch is now in HEAD
+        if self.fingerprints:
+            self.fingerprints.commit(self.blob_ids)
+    
+    def close(self):
+        close_git_sessions()
+
+# Commits the index with plumbing only: no hooks and no status pass.
+# Returns False when the index tree is the same as HEAD's.
+def _commit_index(message):
+    session = get_git_session()
+    parent = session.object_id('HEAD')
+    
+    tree = subprocess.run(['git', 'write-tree'], cwd=REPO_ROOT,
+                          check=True, capture_output=True).stdout.strip()
+    if parent is not None and tree == session.object_id('HEAD^{tree}'):
+        return False
+    
+    args = ['git', 'commit-tree', tree.decode(), '-m', message]
+    if parent is not None:
+        args += ['-p', parent.decode()]
+    commit = subprocess.run(args, cwd=REPO_ROOT, check=True, capture_output=True).stdout.strip()
+    
+    # Old value guards against HEAD having moved underneath us
+    args = ['git', 'update-ref', '-m', f'commit: {message}', 'HEAD', commit.decode()]
+    if parent is not None:
+        args.append(parent.decode())
+    subprocess.run(args, cwd=REPO_ROOT, check=True, capture_output=True)
+    return True
+
+# Serializes index/commit/push between the watcher thread, shutdown flush
+# and upload server, which all go through git_add_commit_push
+_git_lock = threading.Lock()
+
+def git_add_commit_push(files, ntu_name, stager=None, pusher=None):
     if not files:
         return True
     
+    with _git_lock:
+        return _git_add_commit_push(files, ntu_name, stager, pusher)
+
+def _git_add_commit_push(files, ntu_name, stager, pusher):
+    
+    # Single relpath pass; duplicates (save-then-touch) are staged once
+    rel_files = sorted({os.path.relpath(f, REPO_ROOT) for f in files})
+    
     try:
-        for f in files:
-            rel_path = os.path.relpath(f, REPO_ROOT)
-            subprocess.run(['git', 'add', rel_path], cwd=REPO_ROOT, check=True, capture_output=True)
+        if stager:
+            rel_files = stager.stage(rel_files)
+            if not rel_files:
+                stager.committed()
+                print('No changes to commit')
+                return True
+        else:
+            # One git process for the whole batch, paths fed NUL-separated on stdin
+            pathspec = b'\0'.join(os.fsencode(f) for f in rel_files)
+            subprocess.run(['git', 'add', '--pathspec-from-file=-', '--pathspec-file-nul'],
+                           cwd=REPO_ROOT, input=pathspec, check=True, capture_output=True)
         
-        commit_msg = format_commit_message(files, ntu_name)
-        subprocess.run(['git', 'commit', '-m', commit_msg], cwd=REPO_ROOT, check=True, capture_output=True)
+        commit_msg = _format_rel_commit_message(rel_files, ntu_name)
+        has_commit = _commit_index(commit_msg)
+        if stager:
+            stager.committed()
+        if not has_commit:
+            print('No changes to commit')
+            return True
+        
+        if pusher:
+            pusher.notify_commit()
+            print(f'Committed: {commit_msg}')
+            return True
         
         subprocess.run(['git', 'push', 'origin', 'HEAD'], cwd=REPO_ROOT, check=True, capture_output=True)
         
@@ -139,27 +591,118 @@ def git_add_commit_push(files, ntu_name):
         print(f'Git operation failed: {e}')
         return False
 
+# Decouples pushing from committing: commits only bump a counter, and one
+# background thread pushes everything pending at most once per interval,
+# so a burst of batches costs a single round-trip to the remote
+class PushQueue:
+    def __init__(self, interval):
+        self.interval = interval
+        self.pending = 0
+        self.stopped = False
+        self.cv = threading.Condition()
+        self.push_lock = threading.Lock()
+        
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+    
+    def notify_commit(self):
+        with self.cv:
+            self.pending += 1
+            self.cv.notify()
+    
+    def _run(self):
+        while True:
+            with self.cv:
+                while not self.pending and not self.stopped:
+                    self.cv.wait()
+                # The window opens with the first unpushed commit
+                deadline = time.monotonic() + self.interval
+                while not self.stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cv.wait(remaining)
+                if self.stopped:
+                    return
+            
+            self.push()
+    
+    def push(self):
+        with self.push_lock:
+            with self.cv:
+                count = self.pending
+                self.pending = 0
+            if not count:
+                return True
+            
+            result = subprocess.run(['git', 'push', '--atomic', 'origin', 'HEAD'],
+                                    cwd=REPO_ROOT, capture_output=True, text=True)
+            if result.returncode != 0:
+                # Keep the commits queued for the next attempt
+                with self.cv:
+                    self.pending += count
+                print(f'Git push failed: {result.stderr.strip()}')
+                return False
+            
+            print(f'Pushed {count} commit(s)')
+            return True
+    
+    def stop(self):
+        # Push whatever is still queued instead of leaving it local
+        with self.cv:
+            self.stopped = True
+            self.cv.notify()
+        self.worker.join()
+        return self.push()
+
 # ============================================================================
 # File Watching (Desktop)
 # ============================================================================
 
 class FileWatcher:
-    def __init__(self, ntu_name, batch_delay):
+    def __init__(self, ntu_name, batch_delay, push_interval=None):
         self.ntu_name = ntu_name
         self.batch_delay = batch_delay
         self.pending_files = set()
         self.lock = threading.Lock()
-        self.timer = None
+        self.cv = threading.Condition(self.lock)
+        self.first_event = 0.0
+        self.stopped = False
+        self.stager = GitStager(FINGERPRINT_CACHE_FILE)
+        self.pusher = PushQueue(batch_delay if push_interval is None else push_interval)
+        
+        # Single long-lived batching thread instead of a Timer per event
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
     
     def on_file_change(self, filepath):
-        with self.lock:
+        with self.cv:
+            # The batch window opens with the first change, so a continuous
+            # stream of events cannot postpone the commit indefinitely
+            if not self.pending_files:
+                self.first_event = time.monotonic()
             self.pending_files.add(filepath)
+            self.cv.notify()
+    
+    def _run(self):
+        while True:
+            with self.cv:
+                while True:
+                    if self.stopped:
+                        return
+                    if not self.pending_files:
+                        self.cv.wait()
+                        continue
+                    remaining = self.first_event + self.batch_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cv.wait(remaining)
             
-            if self.timer:
-                self.timer.cancel()
-            
-            self.timer = threading.Timer(self.batch_delay, self.process_batch)
-            self.timer.start()
+            # One failed batch must not end the only batching thread
+            try:
+                self.process_batch()
+            except Exception as e:
+                print(f'Batch commit failed: {e}')
     
     def process_batch(self):
         with self.lock:
@@ -169,37 +712,190 @@ class FileWatcher:
             files = list(self.pending_files)
             self.pending_files.clear()
         
-        git_add_commit_push(files, self.ntu_name)
+        git_add_commit_push(files, self.ntu_name, self.stager, self.pusher)
+    
+    def stop(self):
+        # Let a batch already in progress finish first: the pusher and git
+        # sessions must outlive it, or its commit would never be pushed
+        with self.cv:
+            self.stopped = True
+            self.cv.notify()
+        self.worker.join()
+        
+        # Commit whatever is still pending instead of dropping it on exit
+        try:
+            self.process_batch()
+        except Exception as e:
+            print(f'Batch commit failed: {e}')
+        finally:
+            self.pusher.stop()
+            self.stager.close()
 
-def start_file_watcher(ntu_name, batch_delay):
+def lower_process_priority():
+    # The watcher is background work; let editors and the engine win
+    if hasattr(os, 'nice'):
+        try:
+            os.nice(19)
+        except OSError:
+            pass
     try:
-        from watchdog.observers import Observer
-        from watchdog.events import FileSystemEventHandler
+        import psutil
     except ImportError:
-        print('Error: watchdog library not installed')
-        print('Run: pip install watchdog')
         return
+    try:
+        if hasattr(psutil, 'IOPRIO_CLASS_IDLE'):
+            psutil.Process().ionice(psutil.IOPRIO_CLASS_IDLE)
+        elif hasattr(psutil, 'IOPRIO_VERYLOW'):
+            psutil.Process().ionice(psutil.IOPRIO_VERYLOW)
+    except (OSError, psutil.Error):
+        pass
+
+def compile_ignore_patterns(patterns):
+    # One alternation over every pattern, matched against single path names
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(p.rstrip('/')) for p in patterns))
+
+def _watch_inotify(watcher, root, ignore):
+    from inotify_simple import INotify, flags
+    
+    # One inotify fd for the whole tree, registered in a single scandir walk
+    # and drained in bulk; batching is left to the FileWatcher worker
+    inotify = INotify()
+    mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE
+    watches = {}
+    
+    def add_tree(top, report):
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            try:
+                watches[inotify.add_watch(path, mask)] = path
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                if ignore and ignore.match(entry.name):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if WATCH_RECURSIVE:
+                        stack.append(entry.path)
+                elif report:
+                    # Written before the new directory's watch existed
+                    watcher.on_file_change(entry.path)
+    
+    def report_tracked(top):
+        # Files git tracks below a directory that has moved away (or below
+        # the root after an overflow): each is staged as removed if it is gone
+        result = subprocess.run(['git', 'ls-files', '-z', '--', os.path.relpath(top, REPO_ROOT)],
+                                cwd=REPO_ROOT, env=dict(os.environ, GIT_LITERAL_PATHSPECS='1'),
+                                capture_output=True)
+        if result.returncode != 0:
+            print(f'Could not list tracked files under {top}: {result.stderr.decode().strip()}')
+            return
+        for path in result.stdout.split(b'\0'):
+            if path:
+                watcher.on_file_change(os.path.join(REPO_ROOT, os.fsdecode(path)))
+    
+    def drop_tree(top):
+        for wd, path in list(watches.items()):
+            if path == top or path.startswith(top + os.sep):
+                del watches[wd]
+                try:
+                    inotify.rm_watch(wd)
+                except OSError:
+                    pass
+    
+    add_tree(root, report=False)
+    try:
+        while True:
+            for event in inotify.read(timeout=1000):
+                if event.mask & flags.Q_OVERFLOW:
+                    # Events were dropped: rescan the whole tree, re-adding
+                    # any missing watches
+                    print('Warning: inotify event queue overflowed, rescanning assets')
+                    add_tree(root, report=True)
+                    report_tracked(root)
+                    continue
+                base = watches.get(event.wd)
+                if base is None:
+                    continue
+                if event.mask & flags.IGNORED:
+                    del watches[event.wd]
+                    continue
+                if ignore and ignore.match(event.name):
+                    continue
+                
+                path = os.path.join(base, event.name)
+                if event.mask & flags.ISDIR:
+                    if event.mask & flags.MOVED_FROM:
+                        drop_tree(path)
+                        report_tracked(path)
+                    elif WATCH_RECURSIVE and event.mask & (flags.CREATE | flags.MOVED_TO):
+                        add_tree(path, report=True)
+                elif not event.mask & flags.CREATE:
+                    # Creation is followed by CLOSE_WRITE once the file is complete
+                    watcher.on_file_change(path)
+    finally:
+        inotify.close()
+
+def _inotify_available():
+    return sys.platform.startswith('linux') and importlib.util.find_spec('inotify_simple') is not None
+
+def start_file_watcher(ntu_name, batch_delay, ignore_patterns=None):
+    if ignore_patterns is None:
+        ignore_patterns = WATCH_IGNORE_PATTERNS
+    ignore = compile_ignore_patterns(ignore_patterns)
+    
+    use_inotify = _inotify_available()
+    
+    if not use_inotify:
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print('Error: watchdog library not installed')
+            print('Run: pip install watchdog')
+            return
     
     watcher = FileWatcher(ntu_name, batch_delay)
     
+    print(f'Watching {ASSETS_DIR} for changes...')
+    print(f'Batch delay: {batch_delay} seconds')
+    print(f'User: {ntu_name}')
+    print('Press Ctrl+C to stop')
+    
+    if use_inotify:
+        try:
+            _watch_inotify(watcher, ASSETS_DIR, ignore)
+        except KeyboardInterrupt:
+            pass
+        watcher.stop()
+        return
+    
+    def report(event):
+        if event.is_directory:
+            return
+        if ignore:
+            parts = os.path.relpath(event.src_path, ASSETS_DIR).split(os.sep)
+            if any(ignore.match(part) for part in parts):
+                return
+        watcher.on_file_change(event.src_path)
+    
     class AssetEventHandler(FileSystemEventHandler):
         def on_created(self, event):
-            if not event.is_directory:
-                watcher.on_file_change(event.src_path)
+            report(event)
         
         def on_modified(self, event):
-            if not event.is_directory:
-                watcher.on_file_change(event.src_path)
+            report(event)
+        
+        def on_deleted(self, event):
+            report(event)
     
     event_handler = AssetEventHandler()
     observer = Observer()
     observer.schedule(event_handler, ASSETS_DIR, recursive=WATCH_RECURSIVE)
     
-    print(f'Watching {ASSETS_DIR} for changes...')
-    print(f'Batch delay: {batch_delay} seconds')
-    print(f'User: {ntu_name}')
-    print('Press Ctrl+C to stop')
-    
     observer.start()
     try:
         while True:
@@ -207,141 +903,46 @@ def start_file_watcher(ntu_name, batch_delay):
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    watcher.stop()
 
 # ============================================================================
 # Server Mode (iPadOS)
 # ============================================================================
 
-class UploadHandler(BaseHTTPRequestHandler):
-    watcher = None
-    
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        
-        html = '''
-        <html>
-        <head><title>Asset Upload</title></head>
-        <body>
-        <h1>Asset Upload Server</h1>
-        <p>Server is running. Use iOS Shortcuts to upload files.</p>
-        <p>Upload endpoint: POST /upload</p>
-        </body>
-        </html>
-        '''
-        self.wfile.write(html.encode())
-    
-    def do_POST(self):
-        if self.path != '/upload':
-            self.send_response(404)
-            self.end_headers()
-            return
-        
-        try:
-            content_type = self.headers.get('Content-Type', '')
-            if 'multipart/form-data' not in content_type:
-                self.send_response(400)
-                self.end_headers()
-                self.wfile.write(b'Invalid content type')
-                return
-            
-            boundary = content_type.split('boundary=')[1].encode()
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            
-            parts = body.split(b'--' + boundary)
-            
-            filename = None
-            file_data = None
-            
-            for part in parts:
-                if b'Content-Disposition' in part:
-                    lines = part.split(b'\r\n')
-                    for i, line in enumerate(lines):
-                        if b'Content-Disposition' in line and b'filename=' in line:
-                            filename_part = line.split(b'filename=')[1]
-                            filename = filename_part.strip(b'"').decode('utf-8')
-                            
-                            for j in range(i + 1, len(lines)):
-                                if lines[j] == b'':
-                                    file_data = b'\r\n'.join(lines[j+1:])
-                                    if file_data.endswith(b'\r\n'):
-                                        file_data = file_data[:-2]
-                                    break
-                            break
-            
-            if not filename or file_data is None:
-                self.send_response(400)
-                self.end_headers()
-                self.wfile.write(b'No file provided')
-                return
-            
-            filepath = os.path.join(ASSETS_DIR, filename)
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            
-            with open(filepath, 'wb') as f:
-                f.write(file_data)
-            
-            if UploadHandler.watcher:
-                UploadHandler.watcher.on_file_change(filepath)
-            
-            self.send_response(200)
-            self.end_headers()
-            self.wfile.write(f'File uploaded: {filename}'.encode())
-            
-            print(f'Received file: {filename}')
-            
-        except Exception as e:
-            print(f'Upload error: {e}')
-            self.send_response(500)
-            self.end_headers()
-            self.wfile.write(str(e).encode())
-    
-    def log_message(self, format, *args):
-        return
-
-def start_upload_server(host, port, ntu_name, batch_delay):
-    watcher = FileWatcher(ntu_name, batch_delay)
-    UploadHandler.watcher = watcher
-    
-    server = HTTPServer((host, port), UploadHandler)
-    
-    print(f'Server running on http://{host}:{port}')
-    print(f'Upload endpoint: http://{host}:{port}/upload')
-    print(f'User: {ntu_name}')
-    print(f'Batch delay: {batch_delay} seconds')
-    print('Press Ctrl+C to stop')
-    
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print('\nShutting down server...')
-        server.shutdown()
+def start_upload_server(host, port, ntu_name, batch_delay, max_file_size_mb=None, workers=None):
+    # The server stack lives in server.py and is only imported here, so the
+    # watcher never loads it
+    from server import serve_uploads
+    serve_uploads(host, port, ntu_name, batch_delay, max_file_size_mb, workers)
 
 # ============================================================================
 # Setup
 # ============================================================================
 
 def setup_environment():
-    os.makedirs(PROJECT_DIR, exist_ok=True)
-    os.makedirs(ASSETS_DIR, exist_ok=True)
-    os.makedirs(BUILDS_DIR, exist_ok=True)
-    os.makedirs(SCRIPT_DIR, exist_ok=True)
+    # Deepest first: creating a leaf creates its parents, so any directory
+    # already covered by an earlier mkdir is skipped
+    dirs = sorted({Path(PROJECT_DIR), Path(ASSETS_DIR), Path(BUILDS_DIR), Path(SCRIPT_DIR)},
+                  key=lambda d: len(d.parts), reverse=True)
+    created = set()
+    for d in dirs:
+        if d not in created:
+            d.mkdir(parents=True, exist_ok=True)
+            created.add(d)
+            created.update(d.parents)
     
     return init_git_repo()
 
+# PATH lookup and module spec only; nothing is spawned or imported
+@functools.lru_cache(maxsize=1)
 def check_dependencies():
     missing = []
     
-    try:
-        subprocess.run(['git', '--version'], capture_output=True, check=True)
-    except:
+    if shutil.which('git') is None:
         missing.append('git')
     
-    try:
-        import watchdog
-    except ImportError:
+    # Either watcher backend will do
+    if not _inotify_available() and importlib.util.find_spec('watchdog') is None:
         missing.append('watchdog (Python package)')
     
-    return len(missing) == 0, missing
+    return len(missing) == 0, tuple(missing)
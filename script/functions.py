@@ -11,10 +11,13 @@ def load_config():
     """
     pass
 
-def save_config(config):
+def save_config(config, durable=False):
     """
-    Saves user configuration to user_config.json.
+    Saves user configuration to user_config.json atomically (temporary file,
+    fsync, then rename over the old file).
     Args: config (dict) - configuration dictionary to save.
+          durable (bool) - also fsync the directory so the rename survives a
+                           power loss; used for explicit saves from setup.
     """
     pass
 
@@ -26,6 +29,15 @@ def validate_config(config):
     """
     pass
 
+def validate_config_field(key, value):
+    """
+    Validates a single configuration value, e.g. as it is entered during setup.
+    Args: key (str) - configuration key.
+          value - value to check (already cast to its type).
+    Returns: tuple (bool, str) - (is_valid, error_message).
+    """
+    pass
+
 # Git Operations
 def init_git_repo():
     """
@@ -42,11 +54,19 @@ def test_git_authentication():
     """
     pass
 
-def git_add_commit_push(files, ntu_name):
+def git_add_commit_push(files, ntu_name, stager=None, pusher=None):
     """
     Adds files to git, commits with formatted message, and pushes to remote.
     Args: files (list) - list of file paths relative to repo root.
           ntu_name (str) - name of the NTU user.
+          stager (GitStager) - optional staging helper backed by long-running
+                               git processes; it also skips files whose content
+                               already matches HEAD. When omitted, files are
+                               staged with one git add.
+          pusher (PushQueue) - optional push queue; when given, the commit is
+                               only queued and pushed later together with any
+                               other pending commits. When omitted, the commit
+                               is pushed immediately.
     Returns: bool - success status.
     """
     pass
@@ -54,6 +74,8 @@ def git_add_commit_push(files, ntu_name):
 def format_commit_message(files, ntu_name):
     """
     Formats commit message as '<NTU name>: <modification or addition of files>'.
+    At most three files are listed; a directory shared by all files is
+    written once at the end ('a.png, b.png in project/assets/textures/').
     Args: files (list) - list of file paths.
           ntu_name (str) - name of the NTU user.
     Returns: str - formatted commit message.
@@ -61,22 +83,39 @@ def format_commit_message(files, ntu_name):
     pass
 
 # File Watching (Desktop)
-def start_file_watcher(ntu_name, batch_delay):
+def start_file_watcher(ntu_name, batch_delay, ignore_patterns=None):
     """
     Starts file system watcher for project/assets directory.
     Args: ntu_name (str) - name of the NTU user.
           batch_delay (int) - seconds to wait before batching commits.
+          ignore_patterns (list) - shell-style names to skip, a trailing '/'
+                                   excludes a whole directory. Defaults to
+                                   WATCH_IGNORE_PATTERNS.
+    """
+    pass
+
+def lower_process_priority():
+    """
+    Drops the current process to the lowest CPU priority and, when psutil is
+    installed, to idle disk I/O priority. Failures are ignored.
     """
     pass
 
 # Server Mode (iPadOS)
-def start_upload_server(host, port, ntu_name, batch_delay):
+def start_upload_server(host, port, ntu_name, batch_delay, max_file_size_mb=None, workers=None):
     """
-    Starts HTTP server to receive file uploads from iPadOS devices.
+    Starts asyncio HTTP server to receive file uploads from iPadOS devices.
+    The port is bound once by this process; on Linux, several worker
+    processes accept on that socket and hand received files back to this
+    process, which alone commits and pushes.
     Args: host (str) - server host address.
           port (int) - server port.
           ntu_name (str) - name of the NTU user.
           batch_delay (int) - seconds to wait before batching commits.
+          max_file_size_mb (int) - uploads larger than this are rejected
+                                   with 413 (no limit if None).
+          workers (int) - number of server processes; defaults to the CPU
+                          count. Always 1 outside Linux.
     """
     pass
 
@@ -91,6 +130,7 @@ def setup_environment():
 def check_dependencies():
     """
     Checks if required system dependencies are installed.
-    Returns: tuple (bool, list) - (all_installed, missing_dependencies).
+    Returns: tuple (bool, tuple) - (all_installed, missing_dependencies).
+    Result is cached for the life of the process.
     """
     pass
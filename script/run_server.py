@@ -9,8 +9,7 @@ import os
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from core import *
-from config import *
+from core import load_config, validate_config, check_dependencies, start_upload_server
 
 def main():
     config = load_config()
@@ -32,8 +31,10 @@ def main():
     port = config['server_port']
     ntu_name = config['ntu_name']
     batch_delay = config['batch_delay_seconds']
+    max_file_size_mb = config['max_file_size_mb']
+    workers = config['server_workers']
     
-    start_upload_server(host, port, ntu_name, batch_delay)
+    start_upload_server(host, port, ntu_name, batch_delay, max_file_size_mb, workers)
 
 if __name__ == '__main__':
     main()
@@ -9,10 +9,14 @@ import os
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from core import *
-from config import *
+from core import (
+    load_config, validate_config, check_dependencies,
+    lower_process_priority, start_file_watcher,
+)
 
 def main():
+    lower_process_priority()
+    
     config = load_config()
     
     is_valid, error = validate_config(config)
@@ -30,8 +34,9 @@ def main():
     
     ntu_name = config['ntu_name']
     batch_delay = config['batch_delay_seconds']
+    ignore_patterns = config['watch_ignore_patterns']
     
-    start_file_watcher(ntu_name, batch_delay)
+    start_file_watcher(ntu_name, batch_delay, ignore_patterns)
 
 if __name__ == '__main__':
     main()
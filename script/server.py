@@ -0,0 +1,348 @@
+"""
+Upload server (iPadOS mode) of the asset sync system.
+Imported by core.start_upload_server only, so the file watcher never loads it.
+"""
+
+import os
+import re
+import sys
+import time
+import queue
+import socket
+import asyncio
+import secrets
+import multiprocessing
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+
+from config import ASSETS_DIR
+from core import FileWatcher
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Incremental multipart/form-data parser: body chunks are fed as they arrive,
+# the first file part is streamed to its own <filename>.<token>.part and
+# renamed by finish()
+class MultipartUpload:
+    FILENAME_RE = re.compile(rb'filename="?([^";\r\n]*)"?')
+
+    def __init__(self, boundary, dest_dir, size_hint=None):
+        self.delimiter = b'\r\n--' + boundary
+        self.dest_dir = dest_dir
+        # Upper bound for the part size (the request's Content-Length)
+        self.size_hint = size_hint
+        # Leading CRLF so the first boundary matches the same delimiter.
+        # Consumed bytes are written through memoryview slices and dropped
+        # in place, so file data is never re-joined or copied into new bytes.
+        self.buffer = bytearray(b'\r\n')
+        self.state = 'preamble'
+        self.filename = None
+        self.filepath = None
+        self.part_path = None
+        self.file = None
+        self.skip_part = False
+
+    def feed(self, data):
+        self.buffer += data
+        while self._step():
+            pass
+
+    def _consume(self, n, skip=0):
+        # Write buffer[:n] to the current part, then drop n + skip bytes
+        if n and self.state == 'body' and not self.skip_part:
+            with memoryview(self.buffer) as mv, mv[:n] as part:
+                self.file.write(part)
+        del self.buffer[:n + skip]
+
+    def _step(self):
+        if self.state in ('preamble', 'body'):
+            idx = self.buffer.find(self.delimiter)
+            if idx == -1:
+                # Keep a tail that may hold the beginning of the delimiter
+                flush = len(self.buffer) - (len(self.delimiter) - 1)
+                if flush > 0:
+                    self._consume(flush)
+                return False
+            self._consume(idx, len(self.delimiter))
+            self._close_part()
+            self.state = 'boundary'
+            return True
+
+        if self.state == 'boundary':
+            if len(self.buffer) < 2:
+                return False
+            if self.buffer.startswith(b'--'):
+                self.state = 'done'
+                self.buffer.clear()
+                return False
+            end = self.buffer.find(b'\r\n')
+            if end == -1:
+                return False
+            del self.buffer[:end + 2]
+            self.state = 'headers'
+            return True
+
+        if self.state == 'headers':
+            end = self.buffer.find(b'\r\n\r\n')
+            if end == -1:
+                return False
+            self._open_part(bytes(self.buffer[:end]))
+            del self.buffer[:end + 4]
+            self.state = 'body'
+            return True
+
+        self.buffer.clear()
+        return False
+
+    def _open_part(self, headers):
+        self.skip_part = True
+        if self.filename is not None:
+            return
+        for line in headers.split(b'\r\n'):
+            if line.lower().startswith(b'content-disposition') and b'filename=' in line:
+                m = self.FILENAME_RE.search(line)
+                if m and m.group(1):
+                    self.filename = m.group(1).decode('utf-8')
+                    self.filepath = os.path.join(self.dest_dir, self.filename)
+                    os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+                    self.part_path, self.file = self._create_part()
+                    self.skip_part = False
+                    self._preallocate()
+                return
+
+    def _create_part(self):
+        # Unique per upload: concurrent uploads of the same name (a retry,
+        # a second device) must never truncate or share one part file.
+        # Exclusive create keeps the usual umask permissions, unlike tempfile
+        while True:
+            path = f'{self.filepath}.{secrets.token_hex(4)}.part'
+            try:
+                return path, open(path, 'xb')
+            except FileExistsError:
+                continue
+
+    def _preallocate(self):
+        # Reserve the extents up front instead of growing the file per write;
+        # the unused tail is cut off again when the part is closed
+        if not self.size_hint or not hasattr(os, 'posix_fallocate'):
+            return
+        try:
+            os.posix_fallocate(self.file.fileno(), 0, self.size_hint)
+        except OSError:
+            self.size_hint = None
+
+    def _close_part(self):
+        if self.file and not self.skip_part:
+            if self.size_hint:
+                self.file.truncate()
+            self.file.close()
+            self.skip_part = True
+
+    def finish(self):
+        # None if no complete file part was received
+        if self.filepath is None or self.file is None or not self.file.closed:
+            self.abort()
+            return None
+        os.replace(self.part_path, self.filepath)
+        return self.filepath
+
+    def abort(self):
+        if self.file:
+            self.file.close()
+            try:
+                os.remove(self.part_path)
+            except FileNotFoundError:
+                pass
+
+UPLOAD_INDEX_HTML = '''
+        <html>
+        <head><title>Asset Upload</title></head>
+        <body>
+        <h1>Asset Upload Server</h1>
+        <p>Server is running. Use iOS Shortcuts to upload files.</p>
+        <p>Upload endpoint: POST /upload</p>
+        </body>
+        </html>
+        '''
+
+# asyncio HTTP server: every connection is a coroutine on one event loop
+# (no thread per request). One request per connection.
+class UploadServer:
+    def __init__(self, watcher, max_file_size_mb=None):
+        self.watcher = watcher
+        self.max_bytes = max_file_size_mb * 1024 * 1024 if max_file_size_mb else None
+        # Parsing + disk writes run on one dedicated thread, so blocking file
+        # I/O never stalls the event loop; queued chunks from all connections
+        # are drained there in order
+        self.disk = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-disk')
+    
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            
+            if method == 'GET':
+                status, body, content_type = 200, UPLOAD_INDEX_HTML.encode(), 'text/html'
+            elif method == 'POST' and path == '/upload':
+                status, body = await self.upload(reader, writer, headers)
+                content_type = None
+            else:
+                status, body, content_type = 404, b'', None
+            
+            await self.respond(writer, status, body, content_type)
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def respond(self, writer, status, body=b'', content_type=None):
+        head = f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+        if content_type:
+            head += f'Content-type: {content_type}\r\n'
+        head += f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'
+        writer.write(head.encode() + body)
+        await writer.drain()
+    
+    async def upload(self, reader, writer, headers):
+        try:
+            content_type = headers.get('content-type', '')
+            if 'multipart/form-data' not in content_type:
+                return 400, b'Invalid content type'
+            
+            boundary = content_type.split('boundary=')[1].split(';')[0].strip().strip('"').encode()
+            content_length = int(headers.get('content-length', 0))
+            
+            # Reject oversized uploads before receiving any of the body
+            if self.max_bytes and content_length > self.max_bytes:
+                return 413, b'File too large'
+            if headers.get('expect', '').lower() == '100-continue':
+                writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            
+            # Stream the body to disk chunk by chunk, never holding it whole
+            loop = asyncio.get_running_loop()
+            upload = MultipartUpload(boundary, ASSETS_DIR, content_length)
+            try:
+                remaining = content_length
+                while remaining > 0:
+                    chunk = await reader.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await loop.run_in_executor(self.disk, upload.feed, chunk)
+            except Exception:
+                await loop.run_in_executor(self.disk, upload.abort)
+                raise
+            
+            filepath = await loop.run_in_executor(self.disk, upload.finish)
+            filename = upload.filename
+            if filepath is None:
+                return 400, b'No file provided'
+            
+            if self.watcher:
+                self.watcher.on_file_change(filepath)
+            
+            print(f'Received file: {filename}')
+            return 200, f'File uploaded: {filename}'.encode()
+        
+        except Exception as e:
+            print(f'Upload error: {e}')
+            return 500, str(e).encode()
+    
+    async def serve(self, sock):
+        server = await asyncio.start_server(self.handle, sock=sock)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.disk.shutdown()
+
+# Hands completed uploads from a worker process to the parent's watcher,
+# which stays the only process committing and pushing
+class _UploadHandoff:
+    def __init__(self, uploads):
+        self.uploads = uploads
+    
+    def on_file_change(self, filepath):
+        self.uploads.put(filepath)
+
+def _upload_worker(sock, max_file_size_mb, uploads):
+    server = UploadServer(_UploadHandoff(uploads), max_file_size_mb)
+    try:
+        asyncio.run(server.serve(sock))
+    except KeyboardInterrupt:
+        pass
+
+def _multi_worker_supported():
+    # Spawned workers inherit the listening socket by fd passing
+    return sys.platform.startswith('linux')
+
+def serve_uploads(host, port, ntu_name, batch_delay, max_file_size_mb=None, workers=None):
+    if not _multi_worker_supported():
+        workers = 1
+    elif workers is None:
+        workers = os.cpu_count() or 1
+    
+    # The parent binds the port exclusively before anything else starts, so a
+    # second server on the same port fails here instead of silently sharing it
+    # (and racing this one's commits)
+    try:
+        sock = socket.create_server((host, port))
+    except OSError as e:
+        print(f'Error: cannot listen on {host}:{port}: {e}')
+        return
+    
+    watcher = FileWatcher(ntu_name, batch_delay)
+    
+    print(f'Server running on http://{host}:{port}')
+    print(f'Upload endpoint: http://{host}:{port}/upload')
+    print(f'User: {ntu_name}')
+    print(f'Batch delay: {batch_delay} seconds')
+    print(f'Workers: {workers}')
+    print('Press Ctrl+C to stop')
+    
+    if workers <= 1:
+        server = UploadServer(watcher, max_file_size_mb)
+        try:
+            asyncio.run(server.serve(sock))
+        except KeyboardInterrupt:
+            print('\nShutting down server...')
+        watcher.stop()
+        return
+    
+    # One event loop per core, all accepting on the parent's listening socket
+    ctx = multiprocessing.get_context('spawn')
+    uploads = ctx.Queue()
+    procs = [ctx.Process(target=_upload_worker, args=(sock, max_file_size_mb, uploads), daemon=True)
+             for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    sock.close()
+    
+    try:
+        while any(proc.is_alive() for proc in procs):
+            try:
+                watcher.on_file_change(uploads.get(timeout=1))
+            except queue.Empty:
+                pass
+    except KeyboardInterrupt:
+        print('\nShutting down server...')
+    
+    # Workers got the same Ctrl+C; give them a moment before terminating
+    deadline = time.monotonic() + 2
+    for proc in procs:
+        proc.join(max(0, deadline - time.monotonic()))
+        if proc.is_alive():
+            proc.terminate()
+    while True:
+        try:
+            watcher.on_file_change(uploads.get_nowait())
+        except (queue.Empty, OSError, ValueError):
+            break
+    watcher.stop()
@@ -6,64 +6,99 @@ Configures the asset sync system with repository URL and GitHub token.
 
 import sys
 import os
+import json
+import argparse
+import compileall
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from core import *
-from config import *
+from core import (
+    load_config, save_config, validate_config, validate_config_field,
+    setup_environment, test_git_authentication,
+)
+from config import SCRIPT_DIR, DEFAULT_CONFIG
 
-def main():
-    print('=== Asset Sync Setup ===\n')
-    
-    config = load_config()
-    
+# (config key, prompt, caster) for every interactive setting
+PROMPTS = [
+    ('repo_url', 'Repository URL (HTTPS format)', str),
+    ('git_username', 'GitHub Username', str),
+    ('git_email', 'GitHub Email', str),
+    ('ntu_name', 'Display Name (for commits)', str),
+    ('batch_delay_seconds', 'Batch Delay (seconds)', int),
+    ('max_file_size_mb', 'Max File Size (MB)', int),
+    ('server_port', 'Server Port (for iPadOS)', int),
+]
+
+def prompt_config(config):
     print('Enter configuration values (press Enter to keep current value):\n')
     
-    repo_url = input(f'Repository URL (HTTPS format) [{config.get("repo_url", "")}]: ').strip()
-    if repo_url:
-        config['repo_url'] = repo_url
-    
-    git_username = input(f'GitHub Username [{config.get("git_username", "")}]: ').strip()
-    if git_username:
-        config['git_username'] = git_username
+    for key, prompt, caster in PROMPTS:
+        # Ask again for this field only until it is valid or left unchanged
+        while True:
+            raw = input(f'{prompt} [{config.get(key, "")}]: ').strip()
+            if not raw:
+                break
+            try:
+                value = caster(raw)
+            except ValueError:
+                print('Invalid number, try again')
+                continue
+            is_valid, error = validate_config_field(key, value)
+            if is_valid:
+                config[key] = value
+                break
+            print(f'Invalid value: {error}')
+
+def read_config_file(config, path):
+    try:
+        with open(path, 'r') as f:
+            values = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f'Error: cannot read {path}: {e}')
+        sys.exit(1)
     
-    git_email = input(f'GitHub Email [{config.get("git_email", "")}]: ').strip()
-    if git_email:
-        config['git_email'] = git_email
+    if not isinstance(values, dict):
+        print(f'Error: {path} must contain a JSON object')
+        sys.exit(1)
     
-    ntu_name = input(f'Display Name (for commits) [{config.get("ntu_name", "NTU")}]: ').strip()
-    if ntu_name:
-        config['ntu_name'] = ntu_name
+    for key, value in values.items():
+        if key not in DEFAULT_CONFIG:
+            print(f'Error: unknown configuration key: {key}')
+            sys.exit(1)
+        is_valid, error = validate_config_field(key, value)
+        if not is_valid:
+            print(f'Error: {error}')
+            sys.exit(1)
+    config.update(values)
+
+def main():
+    parser = argparse.ArgumentParser(description='Configure the asset sync system.')
+    parser.add_argument('--config-file', help='JSON file with configuration values; skips the prompts')
+    args = parser.parse_args()
     
-    batch_delay = input(f'Batch Delay (seconds) [{config.get("batch_delay_seconds", 60)}]: ').strip()
-    if batch_delay:
-        try:
-            config['batch_delay_seconds'] = int(batch_delay)
-        except ValueError:
-            print('Invalid number, keeping current value')
+    print('=== Asset Sync Setup ===\n')
     
-    max_size = input(f'Max File Size (MB) [{config.get("max_file_size_mb", 100)}]: ').strip()
-    if max_size:
-        try:
-            config['max_file_size_mb'] = int(max_size)
-        except ValueError:
-            print('Invalid number, keeping current value')
+    config = load_config()
     
-    server_port = input(f'Server Port (for iPadOS) [{config.get("server_port", 8080)}]: ').strip()
-    if server_port:
-        try:
-            config['server_port'] = int(server_port)
-        except ValueError:
-            print('Invalid number, keeping current value')
+    if args.config_file:
+        read_config_file(config, args.config_file)
+    else:
+        prompt_config(config)
     
     is_valid, error = validate_config(config)
     if not is_valid:
         print(f'\nError: {error}')
         sys.exit(1)
     
-    save_config(config)
+    save_config(config, durable=True)
     print('\nConfiguration saved.')
     
+    # Bytecode for plain and -OO runs, so the daemons start without
+    # compiling; script/ only, the venv is left alone. One call per level:
+    # passing a list of levels needs Python 3.9
+    for level in (0, 2):
+        compileall.compile_dir(SCRIPT_DIR, maxlevels=0, quiet=1, optimize=level)
+    
     print('\nSetting up environment...')
     if not setup_environment():
         print('Environment setup failed.')